@@ -10,13 +10,14 @@ time.sleep(4)
 
 # slow down to observe better
 robotiq.speed = 10
-robotiq.force = 10
+robotiq.grasp_force = 10
 
-# set a target and observe how it takes some time before this is updated in the registers of the gripper.
+# set a target, this waits until the target is updated in the registers of the gripper.
 robotiq.target_position = 130
-print(f" target pos = {robotiq.target_position}")
-time.sleep(0.2)
-print(f" target pos = {robotiq.target_position}")
+# the target position, speed and force are cached after they are set,
+# invalidate the cache to read the actual register values from the gripper.
+robotiq.invalidate_cache()
+print(f" target pos = {robotiq.target_position}, speed = {robotiq.speed}, force = {robotiq.grasp_force}")
 assert robotiq.target_position == 130
 
 # observe current positions. If you want to wait explicitly for the gripper to reach the target pose,
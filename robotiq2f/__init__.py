@@ -1 +1,2 @@
+from .modbus_driver import Robotiq2F85Modbus
 from .tcp_driver import Robotiq2F85TCP
@@ -0,0 +1,233 @@
+# Library importation
+import time
+from typing import Optional, Tuple
+
+try:
+    from pymodbus.client import ModbusTcpClient
+except ImportError:
+    # optional dependency, only required for this backend. Install with `pip install -e ".[modbus]"`
+    ModbusTcpClient = None
+
+
+class Robotiq2F85Modbus:
+    """Class for controlling the Robotiq 2F85 by addressing its registers directly over ModbusTCP,
+    which allows to read/write all data at once instead of one register per command as with the URCap API.
+
+    The control sequence is gripper motor <---- gripper registers <--ModbusTCP-- remote control
+
+    This requires the gripper's Modbus registers to be exposed over ModbusTCP (e.g. by a Robotiq Modbus TCP gateway).
+    If only the URCap is available on the UR controller, use Robotiq2F85TCP instead.
+
+    The register layout is described in the instruction manual of the gripper:
+    each (16 bit) register holds 2 bytes of the robot output (control) or robot input (status) block.
+    """
+
+    # Modbus slave id of the gripper
+    _SLAVE_ID = 9
+    # start address of the robot output (control) registers: [action request, position request, speed | force]
+    _CONTROL_ADDRESS = 0x03E8
+    # start address of the robot input (status) registers: [gripper status, fault | position echo, position | current]
+    _STATUS_ADDRESS = 0x07D0
+
+    # bits of the action request and gripper status byte
+    _ACT = 0x01
+    _GTO = 0x08
+
+    def __init__(self, host_ip: str, port: int = 502, timeout: float = 1.0) -> None:
+        if ModbusTcpClient is None:
+            raise ImportError(
+                'pymodbus is required for the ModbusTCP backend, install it with `pip install -e ".[modbus]"`'
+            )
+        self.host_ip = host_ip
+        self.port = port
+        self.timeout = timeout
+
+        self._client = ModbusTcpClient(host_ip, port=port, timeout=timeout)
+
+        # the control registers are always written as a whole, so the last written values are kept.
+        # They are read from the gripper on connection, so that a write does not overwrite the current state.
+        self._action = 0
+        self._target_position = 0
+        self._speed = 0
+        self._grasp_force = 0
+
+        self._check_connection()
+        self._read_control()
+
+    def _check_connection(self):
+        """validate communication with gripper is possible.
+        Raises:
+            ConnectionError
+        """
+        if not self._client.connect():
+            raise ConnectionError("Could not connect to gripper")
+        self._read_status()
+
+    def _read_control(self):
+        """Reads the complete control block from the gripper into the last written values."""
+        result = self._client.read_holding_registers(self._CONTROL_ADDRESS, 3, slave=self._SLAVE_ID)
+        if result.isError():
+            raise RuntimeError(f"Could not read gripper control registers: {result}")
+        registers = result.registers
+        self._action = registers[0] >> 8
+        self._target_position = registers[1] & 0xFF
+        self._speed, self._grasp_force = registers[2] >> 8, registers[2] & 0xFF
+
+    def _write_control(self, action: int):
+        """Writes the complete control block (action request, target position, speed and force) in a single frame."""
+        values = [action << 8, self._target_position, self._speed << 8 | self._grasp_force]
+        result = self._client.write_registers(self._CONTROL_ADDRESS, values, slave=self._SLAVE_ID)
+        if result.isError():
+            raise RuntimeError(f"Could not write gripper control registers: {result}")
+        self._action = action
+
+    def _read_status(self) -> Tuple[int, int, int]:
+        """Reads the complete status block in a single frame.
+
+        Returns:
+            Tuple[int, int, int]: gripper status byte, target position echo and actual position.
+        """
+        result = self._client.read_holding_registers(self._STATUS_ADDRESS, 3, slave=self._SLAVE_ID)
+        if result.isError():
+            raise RuntimeError(f"Could not read gripper status registers: {result}")
+        registers = result.registers
+        return registers[0] >> 8, registers[1] & 0xFF, registers[2] >> 8
+
+    def activate_gripper(self):
+        """Activates the gripper, sets target position to "Open" and sets GTO flag."""
+        # a rising edge of the ACT bit is required for the activation
+        self._write_control(0)
+        self._write_control(self._ACT)
+        # the calibration physically takes seconds, so there is no point in polling the status at a high rate.
+        while not (self._read_status()[0] >> 4) & 0x03 == 3:
+            time.sleep(0.05)
+
+        self._target_position, self._speed, self._grasp_force = 0, 255, 0
+        self._write_control(self._ACT | self._GTO)
+
+    def deactivate_gripper(self):
+        self._write_control(0)
+        while not (self._read_status()[0] >> 4) & 0x03 == 0:
+            time.sleep(0.05)
+
+    def set_motion_params(self, position: int, speed: Optional[int] = None, grasp_force: Optional[int] = None):
+        """Set the target position and optionally the speed and grasp force of the gripper in a single frame
+        and wait until the new target position has been set in the gripper's registers.
+
+        Args:
+            position (int): target in range 0 (open) - 255 (closed)
+            speed (int): 0 (slow) - 255 (fast)
+            grasp_force (int): 0 (gentle) - 255 (firm)
+
+        Raises:
+            RuntimeError: if the gripper is not activated.
+            TimeoutError: if the gripper does not echo the new target position within the timeout.
+        """
+        if not self._action & self._ACT:
+            # setting the ACT bit here would (re)start the activation procedure.
+            raise RuntimeError("Gripper is not activated, call activate_gripper first")
+        if speed is not None:
+            self._speed = self._saturate_command(speed)
+        if grasp_force is not None:
+            self._grasp_force = self._saturate_command(grasp_force)
+        self._target_position = self._saturate_command(position)
+        self._write_control(self._ACT | self._GTO)
+
+        deadline = time.monotonic() + self.timeout
+        while not self._read_status()[1] == self._target_position:
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"Gripper did not set target position {self._target_position} within {self.timeout}s"
+                )
+            time.sleep(0.01)
+
+    def move_to_position(self, position: int, speed: int = None, grasp_force: int = None):
+        """Synchronously move the robot to the desired position with the specified speed and grasp force.
+
+        Args:
+            position (int): 0 (open) - 230 (straight closed) - 255 ( encompassed closed if applicable)
+            speed (int): 0 (slow) - 255 (fast)
+            grasp_force (int): 0 (gentle) - 255 (firm)
+        """
+        self.set_motion_params(position, speed or None, grasp_force or None)
+        self.wait_for_motion_complete(timeout=None)
+
+    def wait_for_motion_complete(self, timeout: Optional[float] = 5.0):
+        """Block until the gripper has stopped moving, i.e. the target position is reached or an object is detected.
+
+        Args:
+            timeout (float): maximal time to wait in seconds, None to wait indefinitely.
+
+        Raises:
+            TimeoutError
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_gripper_moving():
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Gripper did not complete its motion within {timeout}s")
+            time.sleep(0.005)
+
+    def close(self):
+        self.move_to_position(255, None, None)
+
+    def open(self):
+        self.move_to_position(0, None, None)
+
+    def disconnect(self):
+        """Closes the ModbusTCP connection."""
+        self._client.close()
+
+    def is_object_detected(self) -> bool:
+        return self._read_status()[0] >> 6 == 2
+
+    def is_gripper_moving(self) -> bool:
+        # Moving == 0 => detected OR position reached
+        return self._read_status()[0] >> 6 == 0
+
+    @property
+    def position(self) -> int:
+        """Position of the gripper fingers (symmetric), see Robotiq2F85TCP.position for its interpretation."""
+        return self._read_status()[2]
+
+    @position.setter
+    def position(self, value: int):
+        raise ValueError("cannot set position directly, use target_position")
+
+    @property
+    def target_position(self) -> int:
+        """Target position value of the gripper. See Position for interpretation of this value."""
+        return self._target_position
+
+    @target_position.setter
+    def target_position(self, position: int):
+        self.set_motion_params(position)
+
+    @property
+    def speed(self) -> int:
+        """Speed of the gripper when opening / closing.
+        Takes values between 0 and 255, which maps to 20mm/s - 150mm/s.
+        """
+        return self._speed
+
+    @speed.setter
+    def speed(self, speed: int):
+        # the control block can only be written as a whole, which (re)sends the current action and target as well.
+        self._speed = self._saturate_command(speed)
+        self._write_control(self._action)
+
+    @property
+    def grasp_force(self) -> int:
+        """Maximal force applied by gripper when closing.
+         Takes values between 0 and 255, which maps to 5N - 220N for the 2F85.
+        If this force is reached, the gripper will signal "Object detected".
+        """
+        return self._grasp_force
+
+    @grasp_force.setter
+    def grasp_force(self, force: int):
+        self._grasp_force = self._saturate_command(force)
+        self._write_control(self._action)
+
+    @staticmethod
+    def _saturate_command(cmd: int) -> int:
+        return cmd if 0 <= cmd <= 255 else (0 if cmd < 0 else 255)
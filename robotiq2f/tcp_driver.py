@@ -1,7 +1,9 @@
 # Library importation
 import asyncio
 import socket
+import threading
 import time
+from typing import List, Optional, Tuple
 
 
 class Robotiq2F85TCP:
@@ -12,18 +14,59 @@ class Robotiq2F85TCP:
     The control sequence is gripper motor <---- gripper registers<--ModbusSerial(rs485)-- UR controller <--TCP-- remote control
 
     This wrapper is not extremely time-efficient but we don't need high control frequencies.
-    Better solution could be to use ModbusTCP to address the gripper's registers directly and read/write all data at once.
+    If the gripper's registers are exposed over ModbusTCP, Robotiq2F85Modbus addresses them directly
+    and reads/writes all data at once.
 
     Another very useful source on the relation between the register values and physical state of the gripper is:
     https://blog.robotiq.com/set-your-robotiq-gripper-by-simply-reading-this-blog-post
     """
 
-    # TODO: could tcp socket be reused instead of opening a new one every time?
-    # TODO: avoid duplication in wait for command set of the target pos/ speed /force
-
-    def __init__(self, host_ip: str, port: int = 63352) -> None:
+    # pre-encoded commands, sent as-is to avoid formatting and encoding them on every call.
+    _GET_STA = b"GET STA\n"
+    _GET_POS = b"GET POS\n"
+    _GET_PRE = b"GET PRE\n"
+    _GET_SPE = b"GET SPE\n"
+    _GET_FOR = b"GET FOR\n"
+    _GET_OBJ = b"GET OBJ\n"
+    _SET_ACT_1 = b"SET ACT 1\n"
+    _SET_ACT_0 = b"SET ACT 0\n"
+    _SET_GTO_1 = b"SET GTO 1\n"
+    # templates for the parameterized commands, to be used with %-formatting of bytes
+    _SET_POS = b"SET POS %d\n"
+    _SET_SPE = b"SET SPE %d\n"
+    _SET_FOR = b"SET FOR %d\n"
+
+    def __init__(self, host_ip: str, port: int = 63352, timeout: float = 1.0) -> None:
+        """
+        Args:
+            host_ip (str): IP address of the UR controller.
+            port (int): TCP port of the URCap API.
+            timeout (float): timeout in seconds for connecting to and receiving a reply from the URCap,
+                so that a hung URCap raises a socket.timeout instead of blocking forever.
+        """
         self.host_ip = host_ip
         self.port = port
+        self.timeout = timeout
+
+        # a single TCP connection is kept open and reused for all commands, guarded by a lock
+        # so that the request/reply pairs of different threads cannot interleave.
+        self._sock = None
+        self._recv_buffer = b""
+        self._lock = threading.Lock()
+
+        # separate connection for the async API, as asyncio streams are bound to the event loop that created them.
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        # the socket of the streams is kept to close it if the event loop is closed before the streams are.
+        self._asock: Optional[socket.socket] = None
+        self._aloop: Optional[asyncio.AbstractEventLoop] = None
+        self._alock: Optional[asyncio.Lock] = None
+
+        # the target position, speed and force registers only change when written, so their values are cached
+        # after an acknowledged write instead of being read back from the gripper. None means unknown.
+        self._cached_target_position: Optional[int] = None
+        self._cached_speed: Optional[int] = None
+        self._cached_grasp_force: Optional[int] = None
 
         self._check_connection()
 
@@ -33,45 +76,285 @@ class Robotiq2F85TCP:
             ConnectionError
         """
 
-        if not self._communicate("GET STA").startswith("STA"):
+        if not self._send_bytes(self._GET_STA).startswith(b"STA"):
             raise ConnectionError("Could not connect to gripper")
 
-    def _communicate(self, command: str) -> str:
-        """Helper function to communicate with gripper over a tcp socket.
+    def _get_sock(self) -> socket.socket:
+        """Returns the persistent socket to the URCap, (re)connecting if there is no open connection."""
+        if self._sock is None:
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._configure_sock(s)
+            s.settimeout(self.timeout)
+            s.connect((self.host_ip, self.port))
+            self._sock = s
+            self._recv_buffer = b""
+            # the connection could have been lost due to a restart of the URCap, which resets the registers.
+            self.invalidate_cache()
+        return self._sock
+
+    @staticmethod
+    def _configure_sock(s: socket.socket):
+        """Configure the socket for the small request/reply messages of the URCap protocol."""
+        # disable Nagle's algorithm, which would otherwise delay sending the ~10 byte commands
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # detect a dead connection to the controller when the socket is idle
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # the messages are tiny, no need for the (large) default buffers
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+
+    def _close_sock(self):
+        """Closes the persistent socket (if any). A new connection is opened on the next command."""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._recv_buffer = b""
+
+    def _recv_line(self, sock: socket.socket) -> bytes:
+        """Reads a single newline-terminated reply from the socket (newline excluded)."""
+        while b"\n" not in self._recv_buffer:
+            data = sock.recv(2**10)
+            if not data:
+                raise ConnectionResetError("Connection closed by the gripper URCap")
+            self._recv_buffer += data
+        line, self._recv_buffer = self._recv_buffer.split(b"\n", 1)
+        return line
+
+    def _send(self, request: bytes, n_replies: int) -> List[bytes]:
+        """Sends the raw request to the URCap and reads the given number of reply lines.
+        The socket is kept open between calls, if the connection is lost it is reopened and the request retried once.
+
+        Args:
+            request (bytes): one or more newline-terminated commands.
+            n_replies (int): number of reply lines to read, the URCap replies with one line per command.
+        """
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    sock = self._get_sock()
+                    sock.sendall(request)
+                    return [self._recv_line(sock) for _ in range(n_replies)]
+                except OSError:
+                    self._close_sock()
+                    # retry once on a fresh connection
+                    if attempt == 1:
+                        raise
+
+    def _communicate_many(self, commands: List[bytes]) -> List[bytes]:
+        """Sends multiple commands to the gripper in a single round-trip.
+
         Args:
-            command (str): The GET/SET command string.
+            commands (List[bytes]): pre-encoded, newline-terminated commands (see the class constants).
 
+        Returns:
+            List[bytes]: the reply of the URCap to each command (without newline), in order.
         """
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        return self._send(b"".join(commands), len(commands))
+
+    def _send_bytes(self, command: bytes) -> bytes:
+        """Sends a single pre-encoded, newline-terminated command (see the class constants) and returns the reply."""
+        return self._send(command, 1)[0]
+
+    def _abind_loop(self):
+        """Binds the async connection state to the running event loop, closing the streams of a previous loop."""
+        loop = asyncio.get_running_loop()
+        if self._aloop is not loop:
+            # streams of another (possibly closed) event loop cannot be reused
+            self._aclose_streams()
+            self._aloop = loop
+            self._alock = asyncio.Lock()
+
+    async def _aget_streams(self):
+        """Returns the persistent asyncio streams to the URCap, (re)connecting if there is no open connection.
+        Must be called while holding _alock, so that concurrent coroutines do not open multiple connections.
+        """
+        if self._writer is None:
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._configure_sock(s)
+            s.setblocking(False)
+            try:
+                await asyncio.wait_for(
+                    asyncio.get_running_loop().sock_connect(s, (self.host_ip, self.port)), self.timeout
+                )
+                self._reader, self._writer = await asyncio.open_connection(sock=s)
+            except BaseException:
+                s.close()
+                raise
+            self._asock = s
+            # the connection could have been lost due to a restart of the URCap, which resets the registers.
+            self.invalidate_cache()
+        return self._reader, self._writer
+
+    def _aclose_streams(self):
+        """Closes the asyncio streams (if any). A new connection is opened on the next async command."""
+        if self._writer is not None:
             try:
-                # open the socket
-                s.connect((self.host_ip, self.port))
-                # s.sendall(b'SET GTO 1\n')
-                s.sendall(("" + str.strip(command) + "\n").encode())
-                # s.sendall(b'SET POS 100 \n')
+                self._writer.close()
+            except RuntimeError:
+                # the event loop of the streams is already closed, so the transport cannot close the socket anymore.
+                self._asock.close()
+            finally:
+                self._reader = None
+                self._writer = None
+                self._asock = None
+
+    async def _asend(self, request: bytes, n_replies: int) -> List[bytes]:
+        """Async equivalent of _send, using a persistent asyncio connection."""
+        self._abind_loop()
+        async with self._alock:
+            for attempt in range(2):
+                try:
+                    reader, writer = await self._aget_streams()
+                    writer.write(request)
+                    await writer.drain()
+                    return [
+                        (await asyncio.wait_for(reader.readuntil(b"\n"), self.timeout))[:-1] for _ in range(n_replies)
+                    ]
+                except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    self._aclose_streams()
+                    # retry once on a fresh connection
+                    if attempt == 1:
+                        raise
+
+    async def _acommunicate_many(self, commands: List[bytes]) -> List[bytes]:
+        """Async equivalent of _communicate_many."""
+        return await self._asend(b"".join(commands), len(commands))
+
+    async def _asend_bytes(self, command: bytes) -> bytes:
+        """Async equivalent of _send_bytes."""
+        return (await self._asend(command, 1))[0]
 
-                data = s.recv(2**10)
-                return data.decode()[:-1]
-            except Exception as e:
-                raise (e)
+    @staticmethod
+    def _parse_int_reply(reply: bytes) -> int:
+        """Parses the value of a GET reply of the URCap, e.g. b"POS 120" -> 120."""
+        return int(reply[reply.index(b" ") + 1 :])
+
+    @staticmethod
+    def _check_acks(commands: List[bytes], replies: List[bytes]):
+        """Validate that the URCap acknowledged all SET commands.
+        Raises:
+            RuntimeError
+        """
+        for command, reply in zip(commands, replies):
+            if reply != b"ack":
+                raise RuntimeError(
+                    f"Gripper did not acknowledge command '{command.decode().strip()}', reply was '{reply.decode()}'"
+                )
+
+    def invalidate_cache(self):
+        """Forget the cached target position, speed and force so that they are read from the gripper again.
+        Only required if the registers could have been changed by another client (e.g. the teach pendant).
+        """
+        self._cached_target_position = None
+        self._cached_speed = None
+        self._cached_grasp_force = None
+
+    def disconnect(self):
+        """Closes the TCP connection(s) to the URCap."""
+        with self._lock:
+            self._close_sock()
+        self._aclose_streams()
+
+    def __del__(self):
+        # _sock might not exist if __init__ failed early
+        if getattr(self, "_sock", None) is not None:
+            self._close_sock()
+        if getattr(self, "_writer", None) is not None:
+            self._aclose_streams()
 
     def activate_gripper(self):
         """Activates the gripper, sets target position to "Open" and sets GTO flag."""
-        self._communicate("SET ACT 1")
-        while not self._communicate("GET STA") == "STA 3":
+        self._send_bytes(self._SET_ACT_1)
+        # the calibration physically takes seconds, so there is no point in polling the status at a high rate.
+        while not self._send_bytes(self._GET_STA) == b"STA 3":
+            time.sleep(0.05)
+
+        # initialize gripper: enable gripper and set target position to open, all in a single round-trip
+        commands = [self._SET_GTO_1, self._SET_SPE % 255, self._SET_FOR % 0, self._SET_POS % 0]
+        self._check_acks(commands, self._communicate_many(commands))
+        self._cached_target_position, self._cached_speed, self._cached_grasp_force = 0, 255, 0
+        while not self._is_target_value_set(0, self._parse_int_reply(self._send_bytes(self._GET_PRE))):
             time.sleep(0.01)
 
-        # initialize gripper
-        self._communicate("SET GTO 1")  # enable Gripper
-        self.target_position = 0
-        self.speed = 255
-        self.force = 0
+    async def aactivate_gripper(self):
+        """Async version of activate_gripper, which does not block the event loop during the calibration."""
+        await self._asend_bytes(self._SET_ACT_1)
+        while not await self._asend_bytes(self._GET_STA) == b"STA 3":
+            await asyncio.sleep(0.05)
+
+        commands = [self._SET_GTO_1, self._SET_SPE % 255, self._SET_FOR % 0, self._SET_POS % 0]
+        self._check_acks(commands, await self._acommunicate_many(commands))
+        self._cached_target_position, self._cached_speed, self._cached_grasp_force = 0, 255, 0
+        while not self._is_target_value_set(0, self._parse_int_reply(await self._asend_bytes(self._GET_PRE))):
+            await asyncio.sleep(0.02)
 
     def deactivate_gripper(self):
-        self._communicate("SET ACT 0")
-        while not self._communicate("GET STA") == "STA 0":
+        self._send_bytes(self._SET_ACT_0)
+        while not self._send_bytes(self._GET_STA) == b"STA 0":
+            time.sleep(0.05)
+        self.invalidate_cache()
+
+    def set_motion_params(self, position: int, speed: Optional[int] = None, grasp_force: Optional[int] = None):
+        """Set the target position and optionally the speed and grasp force of the gripper in a single round-trip
+        and wait until the new target position has been set in the gripper's registers.
+        The speed and force are confirmed by the acknowledgement of the URCap and are not read back.
+
+        Args:
+            position (int): target in range 0 (open) - 255 (closed)
+            speed (int): 0 (slow) - 255 (fast)
+            grasp_force (int): 0 (gentle) - 255 (firm)
+        """
+        commands, target_position, speed, grasp_force = self._build_motion_commands(position, speed, grasp_force)
+        target_position_changed = self._is_target_position_changed(target_position)
+        replies = self._communicate_many(commands)
+        # a reconnect invalidates the cache, in which case the register cannot be assumed to hold the target already.
+        target_position_changed = target_position_changed or self._cached_target_position is None
+        self._check_acks(commands, replies)
+        self._update_cache(target_position, speed, grasp_force)
+
+        # the target position register takes some time to update, which is required before polling the motion status.
+        if not target_position_changed:
+            return
+        while not self._is_target_value_set(target_position, self._parse_int_reply(self._send_bytes(self._GET_PRE))):
             time.sleep(0.01)
 
+    def _build_motion_commands(
+        self, position: int, speed: Optional[int], grasp_force: Optional[int]
+    ) -> Tuple[List[bytes], int, Optional[int], Optional[int]]:
+        """Builds the SET commands for a motion, with all values saturated to the register range.
+
+        Returns:
+            the commands and the saturated target position, speed and grasp force (None if not set).
+        """
+        commands = []
+        # speed and force are set before the position as setting the position triggers the motion.
+        if speed is not None:
+            speed = self._saturate_command(speed)
+            commands.append(self._SET_SPE % speed)
+        if grasp_force is not None:
+            grasp_force = self._saturate_command(grasp_force)
+            commands.append(self._SET_FOR % grasp_force)
+        target_position = self._saturate_command(position)
+        commands.append(self._SET_POS % target_position)
+        return commands, target_position, speed, grasp_force
+
+    def _is_target_position_changed(self, target_position: int) -> bool:
+        """Whether the target position register does not hold this target yet, according to the cache.
+        If it does, there is no need to read back the register until it is updated.
+        """
+        return self._cached_target_position is None or not self._is_target_value_set(
+            target_position, self._cached_target_position
+        )
+
+    def _update_cache(self, target_position: int, speed: Optional[int], grasp_force: Optional[int]):
+        self._cached_target_position = target_position
+        if speed is not None:
+            self._cached_speed = speed
+        if grasp_force is not None:
+            self._cached_grasp_force = grasp_force
+
     def move_to_position(self, position: int, speed: int = None, grasp_force: int = None):
         """Synchronously move the robot to the desired position with the specified speed and grasp force.
 
@@ -80,29 +363,52 @@ class Robotiq2F85TCP:
             speed (int): 0 (slow) - 255 (fast)
             grasp_force (int): 0 (gentle) - 255 (firm)
         """
-        if speed:
-            self.speed = speed
-        if grasp_force:
-            self.force = grasp_force
-        self.target_position = position
+        self.set_motion_params(position, speed or None, grasp_force or None)
+        self.wait_for_motion_complete(timeout=None)
+
+    def wait_for_motion_complete(self, timeout: Optional[float] = 5.0):
+        """Block until the gripper has stopped moving, i.e. the target position is reached or an object is detected.
+
+        The URCap does not push status updates, so the object detection status is polled at a short interval
+        over the persistent connection, which limits the overhead of each poll to a single round-trip.
+
+        Args:
+            timeout (float): maximal time to wait in seconds, None to wait indefinitely.
+
+        Raises:
+            TimeoutError
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
         while self.is_gripper_moving():
-            time.sleep(0.05)
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Gripper did not complete its motion within {timeout}s")
+            time.sleep(0.005)
 
     async def amove_to_position(self, position: int, speed: int = None, grasp_force: int = None):
         """Asynchronously move the robot to the desired position with the specified speed and grasp force.
+        All communication is done over asyncio streams, so one event loop can control multiple grippers concurrently.
 
         Args:
             position (int): 0 (open) - 230 (straight closed) - 255 ( encompassed closed if applicable)
             speed (int): 0 (slow) - 255 (fast)
             grasp_force (int): 0 (gentle) - 255 (firm)
         """
-        if speed:
-            self.speed = speed
-        if grasp_force:
-            self.force = grasp_force
-        self.target_position = position
-        while self.is_gripper_moving():
-            await asyncio.sleep(0.05)
+        commands, target_position, speed, grasp_force = self._build_motion_commands(
+            position, speed or None, grasp_force or None
+        )
+        target_position_changed = self._is_target_position_changed(target_position)
+        replies = await self._acommunicate_many(commands)
+        target_position_changed = target_position_changed or self._cached_target_position is None
+        self._check_acks(commands, replies)
+        self._update_cache(target_position, speed, grasp_force)
+
+        while target_position_changed and not self._is_target_value_set(
+            target_position, self._parse_int_reply(await self._asend_bytes(self._GET_PRE))
+        ):
+            await asyncio.sleep(0.02)
+        # Moving == 0 => detected OR position reached
+        while self._parse_int_reply(await self._asend_bytes(self._GET_OBJ)) == 0:
+            await asyncio.sleep(0.02)
 
     def close(self):
         self.move_to_position(255, None, None)
@@ -111,11 +417,11 @@ class Robotiq2F85TCP:
         self.move_to_position(0, None, None)
 
     def is_object_detected(self) -> bool:
-        return int(self._communicate("GET OBJ").split(" ")[1]) == 2
+        return self._parse_int_reply(self._send_bytes(self._GET_OBJ)) == 2
 
     def is_gripper_moving(self) -> bool:
         # Moving == 0 => detected OR position reached
-        return int(self._communicate("GET OBJ").split(" ")[1]) == 0
+        return self._parse_int_reply(self._send_bytes(self._GET_OBJ)) == 0
 
     @property
     def position(self) -> int:
@@ -124,7 +430,7 @@ class Robotiq2F85TCP:
         3 is actually fully open, 230 is fully closed in operating mode (straight fingers) and 255 is fully closed in encompassed mode.
         The range 3 - 230 maps approximately to 0mm - 85mm with a quasi linear relation of 0.4mm / unit
         """
-        return int(self._communicate("GET POS").split(" ")[1])
+        return self._parse_int_reply(self._send_bytes(self._GET_POS))
 
     @position.setter
     def position(self, value: int):
@@ -133,7 +439,9 @@ class Robotiq2F85TCP:
     @property
     def target_position(self) -> int:
         """Target position value of the gripper. See Position for interpretation of this value."""
-        return int(self._communicate("GET PRE").split(" ")[1])
+        if self._cached_target_position is None:
+            self._cached_target_position = self._parse_int_reply(self._send_bytes(self._GET_PRE))
+        return self._cached_target_position
 
     @target_position.setter
     def target_position(self, position: int):
@@ -142,24 +450,23 @@ class Robotiq2F85TCP:
         Args:
             position (int): target in range 0 (open) - 255 (closed)
         """
-        self._communicate(f"SET  POS {position}")
-        target_position = self._saturate_command(position)
-        while not self._is_target_value_set(target_position, self.target_position):
-            time.sleep(0.01)
+        self.set_motion_params(position)
 
     @property
     def speed(self):
         """Speed of the gripper when opening / closing.
         Takes values between 0 and 255, which maps to 20mm/s - 150mm/s.
         """
-        return int(self._communicate(f"GET SPE").split(" ")[1])
+        if self._cached_speed is None:
+            self._cached_speed = self._parse_int_reply(self._send_bytes(self._GET_SPE))
+        return self._cached_speed
 
     @speed.setter
     def speed(self, speed: int):
         speed = self._saturate_command(speed)
-        self._communicate(f"SET SPE {speed}")
-        while not self._is_target_value_set(speed, self.speed):
-            time.sleep(0.01)
+        command = self._SET_SPE % speed
+        self._check_acks([command], [self._send_bytes(command)])
+        self._cached_speed = speed
 
     @property
     def grasp_force(self):
@@ -167,20 +474,22 @@ class Robotiq2F85TCP:
          Takes values between 0 and 255, which maps to 5N - 220N for the 2F85.
         If this force is reached, the gripper will signal "Object detected".
         """
-        return int(self._communicate("GET FOR").split(" ")[1])
+        if self._cached_grasp_force is None:
+            self._cached_grasp_force = self._parse_int_reply(self._send_bytes(self._GET_FOR))
+        return self._cached_grasp_force
 
     @grasp_force.setter
     def grasp_force(self, force: int):
         force = self._saturate_command(force)
-        self._communicate(f"SET FOR {force}")
-        while not self._is_target_value_set(force, self.force):
-            time.sleep(0.01)
+        command = self._SET_FOR % force
+        self._check_acks([command], [self._send_bytes(command)])
+        self._cached_grasp_force = force
 
     @staticmethod
     def _saturate_command(cmd: int) -> int:
-        return min(255, (max(cmd, 0)))
+        return cmd if 0 <= cmd <= 255 else (0 if cmd < 0 else 255)
 
     @staticmethod
     def _is_target_value_set(target: int, value: int) -> bool:
-        """helper to compare target value to current value and make the force / speed request synchronous"""
+        """helper to compare target value to current value and make the target position request synchronous"""
         return abs(target - value) < 5
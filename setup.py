@@ -8,4 +8,5 @@ setup(
     author_email="thomas.lips@ugent.be",
     description="Driver for controlling a robotiq2F gripper using the Robotiq URCap TCP interface",
     packages=find_packages(),
+    extras_require={"modbus": ["pymodbus>=3.0,<3.7"]},
 )
@@ -0,0 +1,113 @@
+"""Tests for the ModbusTCP backend against a pymodbus server that emulates the register map of the gripper."""
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pymodbus")
+
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusServerContext, ModbusSlaveContext  # noqa: E402
+from pymodbus.server import ServerStop, StartTcpServer  # noqa: E402
+
+from robotiq2f import Robotiq2F85Modbus  # noqa: E402
+
+CONTROL_ADDRESS = 0x03E8
+STATUS_ADDRESS = 0x07D0
+
+
+class GripperBlock(ModbusSequentialDataBlock):
+    """Register block that updates the status registers on a write of the control registers,
+    as an (instantaneous) gripper would."""
+
+    def setValues(self, address, values):
+        super().setValues(address, values)
+        if address == CONTROL_ADDRESS:
+            self.update_status(detected=False)
+
+    def update_status(self, detected: bool):
+        action, position = self.getValues(CONTROL_ADDRESS, 2)
+        action >>= 8
+        activated = action & 0x01
+        gto = action & 0x08
+        sta = 3 if activated else 0
+        obj = (2 if detected else 3) if gto else 0
+        super().setValues(STATUS_ADDRESS, [(obj << 6 | sta << 4 | action) << 8, position & 0xFF, position << 8])
+
+
+@pytest.fixture(scope="module")
+def server():
+    block = GripperBlock(0, [0] * 3000)
+    context = ModbusServerContext(slaves={9: ModbusSlaveContext(hr=block, zero_mode=True)}, single=False)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    thread = threading.Thread(
+        target=StartTcpServer, kwargs={"context": context, "address": ("127.0.0.1", port)}, daemon=True
+    )
+    thread.start()
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+    yield block, port
+    ServerStop()
+
+
+@pytest.fixture
+def block(server):
+    block, _ = server
+    block.setValues(CONTROL_ADDRESS, [0, 0, 0])
+    return block
+
+
+@pytest.fixture
+def gripper(server, block):
+    _, port = server
+    gripper = Robotiq2F85Modbus("127.0.0.1", port)
+    yield gripper
+    gripper.disconnect()
+
+
+def test_activate_and_move(gripper, block):
+    gripper.activate_gripper()
+    assert block.getValues(CONTROL_ADDRESS, 3) == [0x0900, 0, 255 << 8]
+
+    gripper.move_to_position(120, speed=50, grasp_force=300)
+    assert block.getValues(CONTROL_ADDRESS, 3) == [0x0900, 120, 50 << 8 | 255]
+    assert gripper.position == 120
+    assert gripper.target_position == 120
+    assert not gripper.is_gripper_moving()
+    assert not gripper.is_object_detected()
+
+    block.update_status(detected=True)
+    assert gripper.is_object_detected()
+
+    gripper.deactivate_gripper()
+    assert block.getValues(CONTROL_ADDRESS, 1) == [0]
+
+
+def test_control_block_is_read_on_connection(server, block):
+    # gripper is already active and holding an object
+    block.setValues(CONTROL_ADDRESS, [0x0900, 200, 50 << 8 | 30])
+    block.update_status(detected=True)
+
+    gripper = Robotiq2F85Modbus("127.0.0.1", server[1])
+    assert (gripper.target_position, gripper.speed, gripper.grasp_force) == (200, 50, 30)
+
+    gripper.speed = 100
+    assert block.getValues(CONTROL_ADDRESS, 3) == [0x0900, 200, 100 << 8 | 30]
+    gripper.disconnect()
+
+
+def test_setters_do_not_activate(gripper, block):
+    gripper.speed = 100
+    gripper.grasp_force = 20
+    assert block.getValues(CONTROL_ADDRESS, 3) == [0, 0, 100 << 8 | 20]
+    with pytest.raises(RuntimeError):
+        gripper.target_position = 100
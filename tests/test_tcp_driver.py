@@ -0,0 +1,189 @@
+"""Tests for the URCap TCP driver against an in-process fake URCap."""
+import socket
+import threading
+import time
+
+import pytest
+
+from robotiq2f import Robotiq2F85TCP
+
+
+class FakeURCap:
+    """Minimal URCap that answers the GET/SET commands from a register dict, one reply line per command.
+
+    Attributes that change its behaviour:
+        byte_by_byte: send every reply one byte at a time.
+        close_after: close the connection after receiving this many more commands (once).
+        silent: read commands but never reply.
+        nack: registers for which a SET is answered with "nack".
+    """
+
+    def __init__(self):
+        self.registers = {"ACT": 0, "STA": 0, "GTO": 0, "PRE": 0, "POS": 0, "SPE": 0, "FOR": 0, "OBJ": 3}
+        self.received = []
+        self.connections = 0
+        self.byte_by_byte = False
+        self.close_after = None
+        self.silent = False
+        self.nack = set()
+
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket):
+        with conn, conn.makefile("rb") as rfile:
+            for line in rfile:
+                command = line.strip()
+                self.received.append(command)
+                if self.close_after is not None:
+                    self.close_after -= 1
+                    if self.close_after < 0:
+                        self.close_after = None
+                        return
+                if self.silent:
+                    continue
+                reply = self._reply(command.decode().split()) + b"\n"
+                if self.byte_by_byte:
+                    for i in range(len(reply)):
+                        conn.sendall(reply[i : i + 1])
+                        time.sleep(0.001)
+                else:
+                    conn.sendall(reply)
+
+    def _reply(self, parts) -> bytes:
+        if parts[0] == "GET":
+            if parts[1] == "STA":
+                self.registers["STA"] = 3 if self.registers["ACT"] else 0
+            return f"{parts[1]} {self.registers[parts[1]]}".encode()
+        register, value = parts[1], int(parts[2])
+        if register in self.nack:
+            return b"nack"
+        if register == "POS":
+            # the fake gripper reaches its target instantly
+            self.registers["PRE"] = self.registers["POS"] = value
+        else:
+            self.registers[register] = value
+        return b"ack"
+
+    def close(self):
+        self._server.close()
+
+
+@pytest.fixture
+def urcap():
+    urcap = FakeURCap()
+    yield urcap
+    urcap.close()
+
+
+@pytest.fixture
+def gripper(urcap):
+    gripper = Robotiq2F85TCP("127.0.0.1", urcap.port, timeout=0.2)
+    yield gripper
+    gripper.disconnect()
+
+
+def test_socket_is_reused(gripper, urcap):
+    gripper.activate_gripper()
+    gripper.speed = 100
+    assert gripper.position == 0
+    gripper.move_to_position(120)
+    assert gripper.position == 120
+    assert urcap.connections == 1
+
+
+def test_replies_split_over_packets(gripper, urcap):
+    urcap.byte_by_byte = True
+    urcap.registers["POS"] = 87
+    assert gripper.position == 87
+    # batched replies are split per line as well
+    assert gripper._communicate_many([gripper._GET_POS, gripper._SET_SPE % 20, gripper._GET_SPE]) == [
+        b"POS 87",
+        b"ack",
+        b"SPE 20",
+    ]
+
+
+def test_reconnect_and_resend_on_close(gripper, urcap):
+    commands = [gripper._SET_SPE % 20, gripper._SET_FOR % 30, gripper._GET_STA]
+    urcap.received.clear()
+    # close the connection in the middle of the batch
+    urcap.close_after = 1
+    assert gripper._communicate_many(commands) == [b"ack", b"ack", b"STA 0"]
+    assert urcap.connections == 2
+    # the first command and the one that was not answered, followed by the complete batch
+    assert urcap.received == [b"SET SPE 20", b"SET FOR 30", b"SET SPE 20", b"SET FOR 30", b"GET STA"]
+
+
+def test_silent_urcap_times_out(gripper, urcap):
+    urcap.silent = True
+    start = time.monotonic()
+    with pytest.raises(socket.timeout):
+        gripper.position
+    # one timeout for the request and one for the retry on a fresh connection
+    assert 0.35 < time.monotonic() - start < 1.0
+    assert urcap.connections == 2
+
+
+def test_disconnect(gripper, urcap):
+    gripper.disconnect()
+    assert gripper._sock is None
+    # the next command opens a new connection
+    assert gripper.position == 0
+    assert urcap.connections == 2
+
+
+def test_getters_use_cache_after_acked_set(gripper, urcap):
+    gripper.activate_gripper()
+    gripper.speed = 100
+    gripper.grasp_force = 300
+    gripper.target_position = 120
+    urcap.received.clear()
+    assert (gripper.target_position, gripper.speed, gripper.grasp_force) == (120, 100, 255)
+    assert not any(command.startswith(b"GET") for command in urcap.received)
+
+
+def test_nack_raises(gripper, urcap):
+    urcap.nack = {"SPE"}
+    with pytest.raises(RuntimeError):
+        gripper.speed = 10
+    with pytest.raises(RuntimeError):
+        gripper.set_motion_params(100, speed=10)
+
+
+def test_invalidate_cache(gripper, urcap):
+    gripper.speed = 100
+    # changed by another client
+    urcap.registers["SPE"] = 50
+    assert gripper.speed == 100
+    gripper.invalidate_cache()
+    urcap.received.clear()
+    assert gripper.speed == 50
+    assert urcap.received == [b"GET SPE"]
+
+
+def test_reconnect_restores_target_position_wait(gripper, urcap):
+    gripper.target_position = 100
+    # the cache holds the target, so there is no need to wait for the register
+    urcap.received.clear()
+    gripper.set_motion_params(100)
+    assert b"GET PRE" not in urcap.received
+
+    # a reconnect (e.g. URCap restart) invalidates the cache, so the register is read back again
+    urcap.close_after = 0
+    urcap.received.clear()
+    gripper.set_motion_params(100)
+    assert urcap.connections == 2
+    assert b"GET PRE" in urcap.received